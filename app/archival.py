@@ -0,0 +1,91 @@
+import argparse
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+import app.models as models
+from app.database import SessionLocal, get_engine
+
+ORDER_ARCHIVE_AFTER_DAYS=int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", "365"))
+ORDER_ARCHIVE_BATCH_SIZE=int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVABLE_STATUSES=("delivered", "cancelled")
+
+ORDER_COLUMNS=("id", "user_id", "total_cents", "status", "created_at", "updated_at")
+ORDER_ITEM_COLUMNS=("id", "order_id", "product_id", "quantity", "price_at_time_cents")
+
+def archive_cutoff(older_than_days: Optional[int]=None) -> datetime:
+    """Delivered/cancelled orders created before this moment are eligible for archiving"""
+    days=ORDER_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    return datetime.utcnow() - timedelta(days=days)
+
+def range_needs_archive(db: Session, start_date: Optional[datetime], end_date: Optional[datetime]=None) -> bool:
+    """
+    True when a date-filtered range overlaps the archive. Each bound is checked
+    against the newest/oldest archived order, both indexed MIN/MAX lookups.
+    Unfiltered listings read only the hot tables.
+    """
+    if start_date is None and end_date is None:
+        return False
+    if start_date is not None:
+        newest=db.scalar(select(func.max(models.ArchivedOrder.created_at)))
+        if newest is None or start_date > newest:
+            return False
+    if end_date is not None:
+        oldest=db.scalar(select(func.min(models.ArchivedOrder.created_at)))
+        if oldest is None or end_date < oldest:
+            return False
+    return True
+
+def archive_orders(db: Session, older_than_days: Optional[int]=None, batch_size: Optional[int]=None) -> int:
+    """
+    Move delivered/cancelled orders created before the cutoff into the archive
+    tables. Each batch is copied and deleted in its own transaction so the hot
+    tables are never locked for long.
+    """
+    cutoff=archive_cutoff(older_than_days)
+    batch_size=batch_size or ORDER_ARCHIVE_BATCH_SIZE
+    archived=0
+    while True:
+        order_ids=db.scalars(
+            select(models.Order.id)
+            .where(models.Order.status.in_(ARCHIVABLE_STATUSES), models.Order.created_at < cutoff)
+            .order_by(models.Order.id)
+            .limit(batch_size)
+        ).all()
+        if not order_ids:
+            break
+        order_columns=[getattr(models.Order, name) for name in ORDER_COLUMNS]
+        item_columns=[getattr(models.OrderItem, name) for name in ORDER_ITEM_COLUMNS]
+        db.execute(
+            insert(models.ArchivedOrder).from_select(
+                list(ORDER_COLUMNS), select(*order_columns).where(models.Order.id.in_(order_ids))
+            )
+        )
+        db.execute(
+            insert(models.ArchivedOrderItem).from_select(
+                list(ORDER_ITEM_COLUMNS), select(*item_columns).where(models.OrderItem.order_id.in_(order_ids))
+            )
+        )
+        db.execute(delete(models.OrderItem).where(models.OrderItem.order_id.in_(order_ids)), execution_options={"synchronize_session": False})
+        db.execute(delete(models.Order).where(models.Order.id.in_(order_ids)), execution_options={"synchronize_session": False})
+        db.commit()
+        archived += len(order_ids)
+    return archived
+
+def main():
+    """Run archival from cron, e.g. `python -m app.archival --older-than-days 365`"""
+    parser=argparse.ArgumentParser(description="Move old delivered/cancelled orders into the archive tables")
+    parser.add_argument("--older-than-days", type=int, default=ORDER_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ORDER_ARCHIVE_BATCH_SIZE)
+    args=parser.parse_args()
+    get_engine()
+    db=SessionLocal()
+    try:
+        archived=archive_orders(db, older_than_days=args.older_than_days, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Archived {archived} orders")
+
+if __name__ == "__main__":
+    main()
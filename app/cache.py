@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+import app.models as models
+from app.database import SessionLocal, get_engine
+
+CACHE_TTL_SECONDS=float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES=int(os.getenv("CACHE_MAX_ENTRIES", "4096"))
+INVALIDATION_POLL_SECONDS=float(os.getenv("INVALIDATION_POLL_SECONDS", "0.5"))
+INVALIDATION_RETENTION_SECONDS=float(os.getenv("INVALIDATION_RETENTION_SECONDS", "600"))
+
+# Tables whose rows are cached per worker. Any flushed change to one of these
+# is recorded in cache_invalidations so other workers can evict their copy.
+CACHED_TABLES={"products"}
+
+class LocalCache:
+    """Per-process LRU cache with a TTL safety net"""
+    def __init__(self, namespace: str, max_entries: int=CACHE_MAX_ENTRIES, ttl: float=CACHE_TTL_SECONDS):
+        self.namespace=namespace
+        self.max_entries=max_entries
+        self.ttl=ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]"=OrderedDict()
+        self._lock=threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        key=str(key)
+        with self._lock:
+            entry=self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value=entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        key=str(key)
+        with self._lock:
+            self._entries[key]=(time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(str(key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_caches: Dict[str, LocalCache]={}
+
+def get_cache(namespace: str) -> LocalCache:
+    cache=_caches.get(namespace)
+    if cache is None:
+        cache=_caches.setdefault(namespace, LocalCache(namespace))
+    return cache
+
+def _evict(namespace: str, keys: Iterable[str]):
+    cache=_caches.get(namespace)
+    if cache is None:
+        return
+    for key in keys:
+        cache.invalidate(key)
+
+def _clear_all():
+    for cache in _caches.values():
+        cache.clear()
+
+class InvalidationBus:
+    """
+    Keeps worker-local caches coherent across processes.
+
+    Writers append (namespace, key) rows to cache_invalidations in the same
+    transaction as the change. Each worker polls for rows it has not seen yet;
+    on SQLite the poll is skipped entirely unless PRAGMA data_version reports
+    a commit from another connection since the last check.
+    """
+    def __init__(self, poll_interval: float=INVALIDATION_POLL_SECONDS, retention: float=INVALIDATION_RETENTION_SECONDS):
+        self.poll_interval=poll_interval
+        self.retention=retention
+        self._lock=threading.Lock()
+        self._connection=None
+        self._data_version=None
+        self._last_id=0
+        self._last_poll=0.0
+        self._last_prune=0.0
+
+    def start(self):
+        engine=get_engine()
+        self._connection=engine.connect()
+        self._data_version=self._read_data_version()
+        self._last_id=self._connection.execute(select(func.coalesce(func.max(models.CacheInvalidation.id), 0))).scalar()
+        self._connection.rollback()
+        self._last_poll=time.monotonic()
+
+    def stop(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection=None
+
+    def _read_data_version(self) -> Optional[int]:
+        if self._connection.dialect.name != "sqlite":
+            return None
+        return self._connection.exec_driver_sql("PRAGMA data_version").scalar()
+
+    def poll(self, force: bool=False):
+        """Evict entries changed by other workers; cheap enough to call on every cache read"""
+        if self._connection is None:
+            return
+        now=time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if now - self._last_poll > self.retention:
+                # Rows older than the retention window may already be pruned
+                _clear_all()
+            self._last_poll=now
+            data_version=self._read_data_version()
+            if data_version is not None and data_version == self._data_version:
+                return
+            self._data_version=data_version
+            rows=self._connection.execute(
+                select(models.CacheInvalidation.id, models.CacheInvalidation.namespace, models.CacheInvalidation.key)
+                .where(models.CacheInvalidation.id > self._last_id)
+                .order_by(models.CacheInvalidation.id)
+            ).all()
+            for row in rows:
+                _evict(row.namespace, [row.key])
+                self._last_id=row.id
+            if now - self._last_prune > self.retention:
+                cutoff=datetime.utcnow() - timedelta(seconds=self.retention)
+                self._connection.execute(delete(models.CacheInvalidation).where(models.CacheInvalidation.created_at < cutoff))
+                self._connection.commit()
+                self._last_prune=now
+        finally:
+            if self._connection is not None and self._connection.in_transaction():
+                self._connection.rollback()
+            self._lock.release()
+
+_bus: Optional[InvalidationBus]=None
+
+def get_invalidation_bus() -> InvalidationBus:
+    global _bus
+    if _bus is None:
+        _bus=InvalidationBus()
+    return _bus
+
+def cache_get(namespace: str, key):
+    get_invalidation_bus().poll()
+    return get_cache(namespace).get(key)
+
+def cache_set(namespace: str, key, value):
+    get_cache(namespace).set(key, value)
+
+def publish_invalidations(db: Session, namespace: str, keys: Iterable):
+    """
+    Record invalidations for changes made outside the ORM unit of work,
+    e.g. bulk UPDATE statements. Takes effect when the session commits.
+    """
+    keys=[str(key) for key in keys]
+    if not keys:
+        return
+    db.execute(insert(models.CacheInvalidation), [{"namespace": namespace, "key": key} for key in keys])
+    db.info.setdefault("pending_invalidations", set()).update((namespace, key) for key in keys)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _record_flush_invalidations(session, flush_context):
+    changed=set()
+    for instance in session.dirty:
+        table=getattr(instance, "__tablename__", None)
+        if table in CACHED_TABLES and session.is_modified(instance):
+            changed.add((table, str(instance.id)))
+    for instance in session.deleted:
+        table=getattr(instance, "__tablename__", None)
+        if table in CACHED_TABLES:
+            changed.add((table, str(instance.id)))
+    if not changed:
+        return
+    session.connection().execute(insert(models.CacheInvalidation), [{"namespace": namespace, "key": key} for namespace, key in changed])
+    session.info.setdefault("pending_invalidations", set()).update(changed)
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_local_invalidations(session):
+    pending=session.info.pop("pending_invalidations", None)
+    for namespace, key in pending or ():
+        _evict(namespace, [key])
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_local_invalidations(session):
+    session.info.pop("pending_invalidations", None)
@@ -0,0 +1,181 @@
+import os
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli=None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard=None
+
+COMPRESSION_MIN_SIZE=int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL=int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY=int(os.getenv("BROTLI_QUALITY", "4"))
+ZSTD_LEVEL=int(os.getenv("ZSTD_LEVEL", "3"))
+
+class _GzipCompressor:
+    def __init__(self):
+        self._compressor=zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._compressor=brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class _ZstdCompressor:
+    def __init__(self):
+        self._compressor=zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+# Server preference when the client accepts several encodings equally
+COMPRESSORS={"gzip": _GzipCompressor}
+if zstandard is not None:
+    COMPRESSORS["zstd"]=_ZstdCompressor
+if brotli is not None:
+    COMPRESSORS["br"]=_BrotliCompressor
+PREFERENCE=("br", "zstd", "gzip")
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    weights={}
+    for part in accept_encoding.split(","):
+        name, _, params=part.strip().partition(";")
+        name=name.strip().lower()
+        if not name:
+            continue
+        quality=1.0
+        params=params.strip()
+        if params.startswith("q="):
+            try:
+                quality=float(params[2:])
+            except ValueError:
+                quality=0.0
+        weights[name]=quality
+    best=None
+    best_quality=0.0
+    for encoding in PREFERENCE:
+        if encoding not in COMPRESSORS:
+            continue
+        quality=weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality=encoding, quality
+    return best
+
+class CompressionMiddleware:
+    """
+    Negotiated br/zstd/gzip response compression. Bodies smaller than
+    minimum_size are sent as-is; streamed bodies are compressed and flushed
+    chunk by chunk, so memory stays flat and each chunk reaches the client
+    as soon as it is produced.
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int=COMPRESSION_MIN_SIZE):
+        self.app=app
+        self.minimum_size=minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding=negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder=_CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app=app
+        self.encoding=encoding
+        self.minimum_size=minimum_size
+        self.send: Send=None
+        self.start_message: Message=None
+        self.started=False
+        self.passthrough=False
+        self.compressor=None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send=send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message):
+        message_type=message["type"]
+        if message_type == "http.response.start":
+            # Hold the headers until the first body chunk shows how big the response is
+            self.start_message=message
+            self.passthrough="content-encoding" in Headers(raw=message["headers"])
+            return
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body=message.get("body", b"")
+        more_body=message.get("more_body", False)
+        if self.passthrough:
+            if not self.started:
+                self.started=True
+                await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        if not self.started:
+            self.started=True
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough=True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor=COMPRESSORS[self.encoding]()
+            headers=MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"]=self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body=self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"]=str(len(body))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(self.start_message)
+
+        # Flush after every streamed chunk so clients see each batch as it is produced
+        chunk=self.compressor.compress(body)
+        if more_body:
+            if body:
+                chunk += self.compressor.flush()
+        else:
+            chunk += self.compressor.finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
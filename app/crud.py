@@ -1,17 +1,27 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+from datetime import datetime
 from fastapi import HTTPException, status
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, delete, func, insert, literal, select, update
 import app.models as models, app.schemas as schemas
+from app.money import to_cents, from_cents
+from app.archival import range_needs_archive
+from app.cache import publish_invalidations
+import app.reservations as reservations, app.idempotency as idempotency
+from app.readmodels import product_columns, order_columns, to_order_rows
 
 def get_products(db: Session, skip: int=0, limit: int=100, search: str=None, min_price: float=None, max_price: float=None, in_stock: bool=None):
-    query=db.query(models.Product)
+    """List products as read-only rows"""
+    query=db.query(*product_columns())
     if search:
         query=query.filter(models.Product.name.ilike(f"%{search}%"))
     if min_price is not None:
-        query=query.filter(models.Product.price >= min_price)
+        query=query.filter(models.Product.price_cents >= to_cents(min_price))
     if max_price is not None:
-        query=query.filter(models.Product.price <= max_price)
+        query=query.filter(models.Product.price_cents <= to_cents(max_price))
     if in_stock is not None:
         if in_stock:
             query=query.filter(models.Product.stock > 0)
@@ -22,8 +32,11 @@ def get_products(db: Session, skip: int=0, limit: int=100, search: str=None, min
 def get_product(db: Session, product_id: int):
     return db.query(models.Product).filter(models.Product.id == product_id).first()
 
+def _product_values(product: schemas.ProductCreate) -> dict:
+    return {"name": product.name, "price_cents": to_cents(product.price), "stock": product.stock}
+
 def create_product(db: Session, product: schemas.ProductCreate):
-    db_product=models.Product(**product.dict())
+    db_product=models.Product(**_product_values(product))
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
@@ -33,7 +46,7 @@ def update_product(db: Session, product_id: int, updated: schemas.ProductCreate)
     db_product=db.query(models.Product).filter(models.Product.id == product_id).first()
     if not db_product:
         return None
-    for key, value in updated.dict().items():
+    for key, value in _product_values(updated).items():
         setattr(db_product, key, value)
     db.commit()
     db.refresh(db_product)
@@ -47,42 +60,112 @@ def delete_product(db: Session, product_id: int):
     db.commit()
     return True
 
-def get_orders(db: Session, skip: int=0, limit: int=100):
-    return db.query(models.Order).offset(skip).limit(limit).all()
+def _orders_in_range(query, model, user_id: int=None, start_date: datetime=None, end_date: datetime=None):
+    if user_id is not None:
+        query=query.filter(model.user_id == user_id)
+    if start_date is not None:
+        query=query.filter(model.created_at >= start_date)
+    if end_date is not None:
+        query=query.filter(model.created_at <= end_date)
+    return query
+
+def get_orders(db: Session, skip: int=0, limit: int=100, user_id: int=None, start_date: datetime=None, end_date: datetime=None):
+    """
+    List orders from the hot table as read-only rows. Archived orders are merged
+    in only when the date range reaches back into the archive.
+    """
+    hot=_orders_in_range(db.query(*order_columns(models.Order)), models.Order, user_id, start_date, end_date)
+    if not range_needs_archive(db, start_date, end_date):
+        query=hot.order_by(models.Order.id).offset(skip)
+        rows=query.limit(limit).all() if limit is not None else query.all()
+        return to_order_rows(db, rows, models.OrderItem)
+    archived=_orders_in_range(db.query(*order_columns(models.ArchivedOrder)), models.ArchivedOrder, user_id, start_date, end_date)
+    window=skip + limit if limit is not None else None
+    hot=hot.order_by(models.Order.created_at, models.Order.id).limit(window)
+    archived=archived.order_by(models.ArchivedOrder.created_at, models.ArchivedOrder.id).limit(window)
+    merged=heapq.merge(
+        to_order_rows(db, archived.all(), models.ArchivedOrderItem),
+        to_order_rows(db, hot.all(), models.OrderItem),
+        key=lambda order: (order.created_at, order.id)
+    )
+    return list(merged)[skip:window]
+
+def iter_orders(db: Session, skip: int=0, limit: int=None, user_id: int=None, start_date: datetime=None, end_date: datetime=None, batch_size: int=500):
+    """
+    Same rows and order as get_orders, but fetched from a server-side cursor in
+    batches of `batch_size` so large exports never sit in memory at once.
+    """
+    def stream(query, item_model):
+        rows=iter(query.yield_per(batch_size))
+        while True:
+            batch=list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield from to_order_rows(db, batch, item_model)
+
+    hot=_orders_in_range(db.query(*order_columns(models.Order)), models.Order, user_id, start_date, end_date)
+    if not range_needs_archive(db, start_date, end_date):
+        return stream(hot.order_by(models.Order.id).offset(skip).limit(limit), models.OrderItem)
+    archived=_orders_in_range(db.query(*order_columns(models.ArchivedOrder)), models.ArchivedOrder, user_id, start_date, end_date)
+    orders=heapq.merge(
+        stream(archived.order_by(models.ArchivedOrder.created_at, models.ArchivedOrder.id), models.ArchivedOrderItem),
+        stream(hot.order_by(models.Order.created_at, models.Order.id), models.OrderItem),
+        key=lambda order: (order.created_at, order.id)
+    )
+    return islice(orders, skip, skip + limit if limit is not None else None)
 
 def get_order(db: Session, order_id: int):
-    return db.query(models.Order).filter(models.Order.id == order_id).first()
+    order=db.query(models.Order).filter(models.Order.id == order_id).first()
+    if order is None:
+        order=db.query(models.ArchivedOrder).filter(models.ArchivedOrder.id == order_id).first()
+    return order
+
+def _set_order_total(db: Session, order_id: int):
+    """Compute the order total from its items in a single SQL statement"""
+    items_total=(
+        select(func.coalesce(func.sum(models.OrderItem.price_at_time_cents * models.OrderItem.quantity), 0))
+        .where(models.OrderItem.order_id == order_id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(models.Order).where(models.Order.id == order_id).values(total_cents=items_total),
+        execution_options={"synchronize_session": False}
+    )
 
-def create_order_with_stock_management(db: Session, order_data: schemas.OrderCreate):
+def _store_idempotent_response(db: Session, idempotency_record, order: models.Order):
+    """Stage the order response on its claimed idempotency key, inside the order's transaction"""
+    if idempotency_record is None:
+        return
+    db.refresh(order)
+    idempotency.store_response(idempotency_record, schemas.Order.model_validate(order).model_dump(mode="json"))
+
+def create_order_with_stock_management(db: Session, order_data: schemas.OrderCreate, idempotency_record: models.IdempotencyKey=None):
     """
-    Create order with automatic stock management and total calculation
+    Create order with automatic stock management and total calculation.
+    When an idempotency record is given, its response is committed with the order.
     """
-    total_amount=0.0
     order_items_data=[]
     for item in order_data.items:
         product=db.query(models.Product).filter(models.Product.id == item.product_id).first()
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
-        if product.stock < item.quantity:
+        available=max(product.stock - product.reserved, 0)
+        if available < item.quantity:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Not enough stock for {product.name}. Available: {product.stock}, Requested: {item.quantity}"
+                detail=f"Not enough stock for {product.name}. Available: {available}, Requested: {item.quantity}"
             )
-        item_total=product.price * item.quantity
-        total_amount += item_total
         order_items_data.append({
             "product": product,
             "quantity": item.quantity,
-            "price_at_time": product.price
+            "price_at_time_cents": product.price_cents
         })
     db_order=models.Order(
         user_id=order_data.user_id,
-        total=total_amount,
         status="pending"
     )
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    db.flush()
     for item_data in order_items_data:
         product=item_data["product"]
         quantity=item_data["quantity"]
@@ -90,132 +173,295 @@ def create_order_with_stock_management(db: Session, order_data: schemas.OrderCre
             order_id=db_order.id,
             product_id=product.id,
             quantity=quantity,
-            price_at_time=item_data["price_at_time"]
+            price_at_time_cents=item_data["price_at_time_cents"]
         )
         db.add(order_item)
-        product.stock -= quantity
+        # Re-check availability in the UPDATE itself: a cart hold placed since
+        # the read above must not be oversold
+        if not reservations.take_stock(db, product.id, quantity):
+            db.rollback()
+            db.refresh(product)
+            available=max(product.stock - product.reserved, 0)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Not enough stock for {product.name}. Available: {available}, Requested: {quantity}"
+            )
+    db.flush()
+    publish_invalidations(db, "products", {item_data["product"].id for item_data in order_items_data})
+    _set_order_total(db, db_order.id)
+    _store_idempotent_response(db, idempotency_record, db_order)
     db.commit()
     db.refresh(db_order)
     return db_order
 
+# Orders in these states still hold their stock, so deleting them returns it.
+# Shipped and delivered goods are gone; cancelling already restocked.
+RESTOCK_ON_DELETE_STATUSES={"pending", "confirmed"}
+
 def delete_order_with_stock_restore(db: Session, order_id: int):
     """
-    Delete order and restore stock
+    Delete order and restore stock for orders that were never shipped.
+    Returns None if the order does not exist, else whether stock was restored.
     """
     db_order=db.query(models.Order).filter(models.Order.id == order_id).first()
     if not db_order:
-        return False
-    for order_item in db_order.items:
-        product=db.query(models.Product).filter(models.Product.id == order_item.product_id).first()
-        if product:
-            product.stock += order_item.quantity
+        return None
+    restock=db_order.status in RESTOCK_ON_DELETE_STATUSES
+    if restock:
+        for order_item in db_order.items:
+            product=db.query(models.Product).filter(models.Product.id == order_item.product_id).first()
+            if product:
+                product.stock += order_item.quantity
     db.delete(db_order)
     db.commit()
-    return True
+    return restock
+
+def _restore_stock_for_orders(db: Session, order_ids):
+    """Return the items of the given orders to stock with one UPDATE"""
+    product_ids=db.scalars(select(models.OrderItem.product_id).where(models.OrderItem.order_id.in_(order_ids)).distinct()).all()
+    if not product_ids:
+        return
+    restored=(
+        select(func.sum(models.OrderItem.quantity))
+        .where(models.OrderItem.order_id.in_(order_ids), models.OrderItem.product_id == models.Product.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(models.Product).where(models.Product.id.in_(product_ids)).values(stock=models.Product.stock + restored),
+        execution_options={"synchronize_session": False}
+    )
+    publish_invalidations(db, "products", product_ids)
+
+def bulk_update_order_status(db: Session, changes):
+    """
+    Validate status changes against ORDER_STATUS_TRANSITIONS and apply them with
+    one UPDATE per target status. Cancelled orders have their stock restored in
+    bulk. Returns the result summary and (order_id, old_status, new_status)
+    tuples for the orders that actually changed.
+    """
+    result=schemas.BulkOrderStatusResult()
+    order_ids={change.order_id for change in changes}
+    current=dict(db.execute(select(models.Order.id, models.Order.status).where(models.Order.id.in_(order_ids))).all())
+    targets=defaultdict(list)
+    seen=set()
+    for change in changes:
+        old_status=current.get(change.order_id)
+        reason=None
+        if change.order_id in seen:
+            reason="Duplicate change for this order"
+        elif old_status is None:
+            reason="Order not found"
+        elif old_status == change.status:
+            result.unchanged.append(change.order_id)
+        elif change.status not in schemas.ORDER_STATUS_TRANSITIONS.get(old_status, set()):
+            reason=f"Cannot change order status from {old_status} to {change.status.value}"
+        else:
+            targets[change.status].append(change.order_id)
+        seen.add(change.order_id)
+        if reason:
+            result.rejected.append(schemas.OrderStatusRejection(order_id=change.order_id, status=change.status, reason=reason))
+
+    transitions=[]
+    for new_status, ids in targets.items():
+        sources=[source.value for source, allowed in schemas.ORDER_STATUS_TRANSITIONS.items() if new_status in allowed]
+        # Re-check the source status in the UPDATE so a concurrent change is not overwritten
+        changed=set(db.scalars(
+            update(models.Order)
+            .where(models.Order.id.in_(ids), models.Order.status.in_(sources))
+            .values(status=new_status.value)
+            .returning(models.Order.id),
+            execution_options={"synchronize_session": False}
+        ).all())
+        for order_id in ids:
+            if order_id in changed:
+                result.updated.append(order_id)
+                transitions.append((order_id, current[order_id], new_status.value))
+            else:
+                result.rejected.append(schemas.OrderStatusRejection(order_id=order_id, status=new_status, reason="Order status changed concurrently"))
+        if new_status == schemas.OrderStatus.CANCELLED and changed:
+            _restore_stock_for_orders(db, changed)
+    db.commit()
+    return result, transitions
+
+def get_status_notifications(db: Session, transitions):
+    """Email data for changed orders, loaded with one query"""
+    if not transitions:
+        return []
+    rows=db.execute(
+        select(models.Order.id, models.Order.total_cents, models.User.email, models.User.username)
+        .join(models.User, models.User.id == models.Order.user_id)
+        .where(models.Order.id.in_([order_id for order_id, old_status, new_status in transitions]))
+    ).all()
+    recipients={row.id: row for row in rows}
+    notifications=[]
+    for order_id, old_status, new_status in transitions:
+        row=recipients.get(order_id)
+        if row is None:
+            continue
+        notifications.append({
+            "user_email": row.email,
+            "username": row.username,
+            "order_data": {"id": order_id, "total": from_cents(row.total_cents), "status": new_status},
+            "old_status": old_status,
+            "new_status": new_status
+        })
+    return notifications
 
 def get_cart(db: Session, user_id: int):
     return db.query(models.CartItem).filter(models.CartItem.user_id == user_id).all()
 
 def add_to_cart_with_stock_check(db: Session, item: schemas.CartItemCreate):
     """
-    Add to cart with stock validation
+    Add to cart, holding the added units against the product's available stock
     """
     product=db.query(models.Product).filter(models.Product.id == item.product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    if product.stock < 1:
-        raise HTTPException(status_code=400, detail=f"{product.name} is out of stock")
     db_item=db.query(models.CartItem).filter(models.CartItem.user_id == item.user_id, models.CartItem.product_id == item.product_id).first()
+    expires_at=reservations.hold_expiry()
+    held=0
+    quantity=0
+    if db_item:
+        # Claim the line's hold atomically: if the sweeper released it first,
+        # nothing comes back and the whole line is reserved again below
+        claimed=db.execute(
+            update(models.CartItem)
+            .where(models.CartItem.id == db_item.id, models.CartItem.hold_expires_at.is_not(None))
+            .values(hold_expires_at=expires_at)
+            .returning(models.CartItem.quantity),
+            execution_options={"synchronize_session": False}
+        ).scalar()
+        held=claimed or 0
+        quantity=claimed if claimed is not None else db_item.quantity
+    new_quantity=quantity + item.quantity
+    if not reservations.reserve(db, product.id, new_quantity - held):
+        db.rollback()
+        db.refresh(product)
+        available=max(product.stock - product.reserved, 0)
+        if available < 1:
+            raise HTTPException(status_code=400, detail=f"{product.name} is out of stock")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Only {available} {product.name} available. Requested: {new_quantity - held}"
+        )
     if db_item:
-        new_quantity=db_item.quantity + item.quantity
-        if new_quantity > product.stock:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Cannot add {item.quantity} more. Only {product.stock - db_item.quantity} available."
-            )
         db_item.quantity=new_quantity
     else:
-        if item.quantity > product.stock:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Only {product.stock} {product.name} available. Requested: {item.quantity}"
-            )
         db_item=models.CartItem(**item.dict())
         db.add(db_item)
+    db_item.hold_expires_at=expires_at
     db.commit()
     db.refresh(db_item)
     return db_item
 
 def remove_from_cart(db: Session, user_id: int, product_id: int):
-    db_item=db.query(models.CartItem).filter(models.CartItem.user_id == user_id,models.CartItem.product_id == product_id).first()
-    if not db_item:
+    # DELETE ... RETURNING reports whether the line was still held at the moment
+    # it was removed, so units the sweeper already released are not returned twice
+    removed=db.execute(
+        delete(models.CartItem)
+        .where(models.CartItem.user_id == user_id, models.CartItem.product_id == product_id)
+        .returning(models.CartItem.quantity, models.CartItem.hold_expires_at),
+        execution_options={"synchronize_session": False}
+    ).all()
+    if not removed:
+        db.rollback()
         return False
-    db.delete(db_item)
+    held=sum(quantity for quantity, hold_expires_at in removed if hold_expires_at is not None)
+    reservations.unreserve(db, {product_id: held})
     db.commit()
     return True
 
-def checkout_cart(db: Session, user_id: int):
-    cart_items=db.query(models.CartItem).filter(models.CartItem.user_id == user_id).all()
+def checkout_cart(db: Session, user_id: int, idempotency_record: models.IdempotencyKey=None):
+    """
+    Turn the user's cart into an order. Held items already own their stock, so
+    only items whose hold has lapsed are reserved again before the set-based
+    conversion into order items. When an idempotency record is given, its
+    response is committed with the order.
+    """
+    # Refreshing the holds first takes the write lock and keeps the sweeper
+    # from releasing them while the order is built.
+    db.execute(
+        update(models.CartItem)
+        .where(models.CartItem.user_id == user_id, models.CartItem.hold_expires_at.is_not(None))
+        .values(hold_expires_at=reservations.hold_expiry()),
+        execution_options={"synchronize_session": False}
+    )
+    cart_items=db.query(models.CartItem).filter(models.CartItem.user_id == user_id).populate_existing().with_for_update().all()
     if not cart_items:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Cart is empty")
-    total=0.0
-    order_items_data=[]
+    product_ids=[item.product_id for item in cart_items]
+    products={product.id: product for product in db.query(models.Product).filter(models.Product.id.in_(product_ids))}
     for item in cart_items:
-        product=db.query(models.Product).filter(models.Product.id == item.product_id).first()
+        product=products.get(item.product_id)
         if not product:
+            db.rollback()
             raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
-        if product.stock < item.quantity:
+        if item.hold_expires_at is None and not reservations.reserve(db, item.product_id, item.quantity):
+            db.rollback()
             raise HTTPException(
                 status_code=400,
-                detail=f"Not enough stock for {product.name}. Available: {product.stock}, In cart: {item.quantity}"
+                detail=f"Not enough stock for {product.name}. Available: {max(product.stock - product.reserved, 0)}, In cart: {item.quantity}"
             )
-        item_total=product.price * item.quantity
-        total += item_total
-        order_items_data.append({
-            "product": product,
-            "quantity": item.quantity,
-            "price_at_time": product.price,
-            "cart_item": item
-        })
-    new_order=models.Order(user_id=user_id, total=total, status="pending")
+    new_order=models.Order(user_id=user_id, status="pending")
     db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
-    for item_data in order_items_data:
-        product=item_data["product"]
-        quantity=item_data["quantity"]
-        cart_item=item_data["cart_item"]
-        order_item=models.OrderItem(
-            order_id=new_order.id,
-            product_id=product.id,
-            quantity=quantity,
-            price_at_time=item_data["price_at_time"]
+    db.flush()
+    cart=select(models.CartItem.product_id, models.CartItem.quantity).where(models.CartItem.user_id == user_id).subquery()
+    db.execute(
+        insert(models.OrderItem).from_select(
+            ["order_id", "product_id", "quantity", "price_at_time_cents"],
+            select(literal(new_order.id), cart.c.product_id, cart.c.quantity, models.Product.price_cents)
+            .join(models.Product, models.Product.id == cart.c.product_id)
         )
-        db.add(order_item)
-        product.stock -= quantity
-        db.delete(cart_item)
+    )
+    held_quantity=(
+        select(func.sum(models.CartItem.quantity))
+        .where(models.CartItem.user_id == user_id, models.CartItem.product_id == models.Product.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(models.Product)
+        .where(models.Product.id.in_(product_ids))
+        .values(stock=models.Product.stock - held_quantity, reserved=models.Product.reserved - held_quantity),
+        execution_options={"synchronize_session": False}
+    )
+    db.execute(delete(models.CartItem).where(models.CartItem.user_id == user_id), execution_options={"synchronize_session": False})
+    _set_order_total(db, new_order.id)
+    publish_invalidations(db, "products", product_ids)
+    _store_idempotent_response(db, idempotency_record, new_order)
     db.commit()
     db.refresh(new_order)
     return new_order
 
 def search_products(db: Session, search_term: str, skip: int=0, limit: int=100):
     """Search products by name"""
-    return db.query(models.Product).filter(models.Product.name.ilike(f"%{search_term}%")).offset(skip).limit(limit).all()
+    return db.query(*product_columns()).filter(models.Product.name.ilike(f"%{search_term}%")).offset(skip).limit(limit).all()
 
 def filter_products_by_price(db: Session, min_price: float=None, max_price: float=None, skip: int=0, limit: int=100):
     """Filter products by price range"""
-    query=db.query(models.Product)
+    query=db.query(*product_columns())
     if min_price is not None:
-        query=query.filter(models.Product.price >= min_price)
+        query=query.filter(models.Product.price_cents >= to_cents(min_price))
     if max_price is not None:
-        query=query.filter(models.Product.price <= max_price)
+        query=query.filter(models.Product.price_cents <= to_cents(max_price))
     return query.offset(skip).limit(limit).all()
 
 def get_products_in_stock(db: Session, in_stock: bool=True, skip: int=0, limit: int=100):
     """Get products based on stock availability"""
-    query=db.query(models.Product)
+    query=db.query(*product_columns())
     if in_stock:
         query=query.filter(models.Product.stock > 0)
     else:
         query=query.filter(models.Product.stock == 0)
-    return query.offset(skip).limit(limit).all()
\ No newline at end of file
+    return query.offset(skip).limit(limit).all()
+
+def get_sales_report(db: Session):
+    """Order counts and revenue per status, summed exactly over integer cents"""
+    rows=db.query(
+        models.Order.status,
+        func.count(models.Order.id),
+        func.coalesce(func.sum(models.Order.total_cents), 0)
+    ).group_by(models.Order.status).all()
+    by_status={order_status: {"orders": count, "revenue": from_cents(total)} for order_status, count, total in rows}
+    revenue_cents=sum(total for order_status, count, total in rows if order_status != "cancelled")
+    return {"revenue": from_cents(revenue_cents), "by_status": by_status}
\ No newline at end of file
@@ -1,14 +1,72 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL="sqlite:///./ecommerce.db"
+SQLALCHEMY_DATABASE_URL=os.getenv("DATABASE_URL", "sqlite:///./ecommerce.db")
+# Optional read replica for catalog and order-history reads
+REPLICA_DATABASE_URL=os.getenv("REPLICA_DATABASE_URL")
+DB_POOL_SIZE=int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW=int(os.getenv("DB_MAX_OVERFLOW", "10"))
+SQLITE_BUSY_TIMEOUT_MS=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 
-engine=create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal=sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engine=None
+_replica_engine=None
+SessionLocal=sessionmaker(autocommit=False, autoflush=False)
+ReplicaSessionLocal=sessionmaker(autocommit=False, autoflush=False)
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers in other worker processes proceed while one writes,
+    # and busy_timeout makes concurrent writers wait instead of failing.
+    cursor=dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def _set_sqlite_replica_pragmas(dbapi_connection, connection_record):
+    # The replica file is only ever written by the sync step
+    cursor=dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def _create_engine(url: str, sqlite_pragmas):
+    if _is_sqlite(url):
+        engine=create_engine(url, connect_args={"check_same_thread": False}, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+        event.listen(engine, "connect", sqlite_pragmas)
+        return engine
+    return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+
+def get_engine():
+    """Create the engine on first use and bind SessionLocal to it"""
+    global _engine
+    if _engine is None:
+        _engine=_create_engine(SQLALCHEMY_DATABASE_URL, _set_sqlite_pragmas)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+def get_replica_engine():
+    """Create the replica engine on first use; None when no replica is configured"""
+    global _replica_engine
+    if REPLICA_DATABASE_URL and _replica_engine is None:
+        _replica_engine=_create_engine(REPLICA_DATABASE_URL, _set_sqlite_replica_pragmas)
+        ReplicaSessionLocal.configure(bind=_replica_engine)
+    return _replica_engine
+
+def dispose_engine():
+    """Close pooled connections, e.g. on application shutdown"""
+    global _engine, _replica_engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine=None
+    if _replica_engine is not None:
+        _replica_engine.dispose()
+        _replica_engine=None
 
 def get_db():
+    get_engine()
     db=SessionLocal()
     try:
         yield db
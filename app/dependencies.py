@@ -4,7 +4,8 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import timedelta
-from . import models, database
+from . import models
+from .database import get_db
 
 #Security Config
 SECRET_KEY="supersecretkey"
@@ -14,13 +15,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES=30
 pwd_context=CryptContext(schemes=["argon2"], deprecated="auto")
 oauth2_scheme=OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_db():
-    db=database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -71,6 +71,14 @@ class EmailService:
         
         return self._send_email(user_email, subject, body)
     
+    def send_status_updates(self, notifications: list):
+        """Send a batch of status update emails queued as one background task"""
+        sent=0
+        for notification in notifications:
+            if self.send_status_update(**notification):
+                sent += 1
+        return sent
+    
     def _send_email(self, recipient_email: str, subject: str, body: str) -> bool:
         """Internal method to send email"""
         try:
@@ -102,4 +110,11 @@ class EmailService:
             print(f"Email error: {e}")
             return False
 
-email_service=EmailService()
\ No newline at end of file
+_email_service: Optional[EmailService]=None
+
+def get_email_service() -> EmailService:
+    """Return the shared EmailService, creating it on first use"""
+    global _email_service
+    if _email_service is None:
+        _email_service=EmailService()
+    return _email_service
\ No newline at end of file
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import app.models as models
+
+IDEMPOTENCY_TTL_HOURS=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_WAIT_SECONDS=float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_POLL_SECONDS=0.05
+# An in-progress claim older than this is assumed dead (its worker crashed
+# before committing) and may be taken over by a retry
+IDEMPOTENCY_LEASE_SECONDS=float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+IDEMPOTENCY_PURGE_BATCH_SIZE=1000
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS=float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+
+def request_fingerprint(method: str, path: str, payload=None) -> str:
+    """Hash of the request a key was first used with, to reject reuse for a different request"""
+    canonical=json.dumps([method.upper(), path, payload], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _load(db: Session, user_id: int, key: str) -> Optional[models.IdempotencyKey]:
+    return db.query(models.IdempotencyKey).filter(models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key).first()
+
+def begin(db: Session, key: str, user_id: int, fingerprint: str) -> Tuple[Optional[models.IdempotencyKey], Optional[JSONResponse]]:
+    """
+    Claim an idempotency key before doing the work.
+
+    Returns (record, None) when the caller owns the key and should process the
+    request, or (None, response) when the request was already completed. A
+    duplicate that arrives while the first request is still running waits for
+    it to finish; a claim whose lease has run out is taken over.
+    """
+    deadline=time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        now=datetime.utcnow()
+        record=models.IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            fingerprint=fingerprint,
+            status="in_progress",
+            created_at=now,
+            expires_at=now + timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+        )
+        db.add(record)
+        try:
+            db.commit()
+            return record, None
+        except IntegrityError:
+            db.rollback()
+
+        record=_load(db, user_id, key)
+        if record is None:
+            continue
+        if record.expires_at < now:
+            db.delete(record)
+            db.commit()
+            continue
+        if record.fingerprint != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if record.status == "completed":
+            return None, JSONResponse(
+                content=json.loads(record.response_body),
+                status_code=record.response_status,
+                headers={"Idempotent-Replayed": "true"}
+            )
+        if record.created_at < now - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS) and _take_over(db, record, now):
+            return record, None
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+        # End the read transaction so the next attempt sees the other request's commit
+        db.rollback()
+        time.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+def _take_over(db: Session, record: models.IdempotencyKey, now: datetime) -> bool:
+    """Renew a stale in-progress claim; only one of several concurrent retries wins"""
+    result=db.execute(
+        update(models.IdempotencyKey)
+        .where(
+            models.IdempotencyKey.id == record.id,
+            models.IdempotencyKey.status == "in_progress",
+            models.IdempotencyKey.created_at == record.created_at
+        )
+        .values(created_at=now),
+        execution_options={"synchronize_session": False}
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        return False
+    db.commit()
+    return True
+
+def store_response(record: models.IdempotencyKey, response_body, status_code: int=200):
+    """
+    Mark a claimed key completed with its response. Does not commit: callers
+    stage this in the same transaction as the work, so a committed order always
+    has a replayable response.
+    """
+    record.status="completed"
+    record.response_status=status_code
+    record.response_body=json.dumps(response_body, separators=(",", ":"))
+
+def release(db: Session, key: str, user_id: int):
+    """Forget an in-progress key after a failure so the client can retry it"""
+    db.rollback()
+    db.execute(
+        delete(models.IdempotencyKey).where(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.status == "in_progress"
+        )
+    )
+    db.commit()
+
+def purge_expired(db: Session) -> int:
+    """Delete expired keys in batches; returns the number removed"""
+    purged=0
+    while True:
+        ids=db.scalars(
+            select(models.IdempotencyKey.id)
+            .where(models.IdempotencyKey.expires_at < datetime.utcnow())
+            .limit(IDEMPOTENCY_PURGE_BATCH_SIZE)
+        ).all()
+        if not ids:
+            return purged
+        db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.id.in_(ids)))
+        db.commit()
+        purged += len(ids)
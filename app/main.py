@@ -1,11 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.models import Base
-from app.database import engine
+from app.database import get_engine, get_replica_engine, dispose_engine
+from app.compression import CompressionMiddleware
+from app.routing import ReplicaStickinessMiddleware
+from app.cache import get_invalidation_bus
+from app.idempotency import purge_expired, IDEMPOTENCY_PURGE_INTERVAL_SECONDS
+from app.reservations import release_expired_holds, HOLD_SWEEP_INTERVAL_SECONDS
+from app.tasks import start_periodic_tasks, stop_periodic_tasks
+from app.email_service import get_email_service
 from app.routes import auth, products, orders, cart, admin
 
-app=FastAPI(title="Order Management System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes are applied separately with `alembic upgrade head`;
+    # startup only wires up the engine and shared services for this worker.
+    get_engine()
+    get_replica_engine()
+    get_email_service()
+    bus=get_invalidation_bus()
+    bus.start()
+    tasks=start_periodic_tasks([
+        (purge_expired, IDEMPOTENCY_PURGE_INTERVAL_SECONDS),
+        (release_expired_holds, HOLD_SWEEP_INTERVAL_SECONDS),
+    ])
+    yield
+    await stop_periodic_tasks(tasks)
+    bus.stop()
+    dispose_engine()
 
-Base.metadata.create_all(bind=engine)
+app=FastAPI(title="Order Management System", lifespan=lifespan)
+app.add_middleware(ReplicaStickinessMiddleware)
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(auth.router)
 app.include_router(products.router)
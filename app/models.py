@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -19,16 +19,20 @@ class Product(Base):
     __tablename__="products"
     id=Column(Integer, primary_key=True, index=True)
     name=Column(String, index=True)
-    price=Column(Float)
+    price_cents=Column(Integer)
     stock=Column(Integer)
+    # Units held by carts; stock - reserved is what new holds and orders may take
+    reserved=Column(Integer, default=0, nullable=False)
 
 class Order(Base):
     __tablename__="orders"
+    # Never reuse ids: archived orders keep theirs
+    __table_args__={"sqlite_autoincrement": True}
     id=Column(Integer, primary_key=True, index=True)
-    user_id=Column(Integer, ForeignKey("users.id"))
-    total=Column(Float)
+    user_id=Column(Integer, ForeignKey("users.id"), index=True)
+    total_cents=Column(Integer, default=0)
     status=Column(String, default="pending")
-    created_at=Column(DateTime, default=datetime.utcnow)
+    created_at=Column(DateTime, default=datetime.utcnow, index=True)
     updated_at=Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user=relationship("User", back_populates="orders")
@@ -36,21 +40,68 @@ class Order(Base):
 
 class OrderItem(Base):
     __tablename__="order_items"
+    __table_args__={"sqlite_autoincrement": True}
     id=Column(Integer, primary_key=True, index=True)
-    order_id=Column(Integer, ForeignKey("orders.id"))
+    order_id=Column(Integer, ForeignKey("orders.id"), index=True)
     product_id=Column(Integer, ForeignKey("products.id"))
     quantity=Column(Integer, nullable=False)
-    price_at_time=Column(Float)
+    price_at_time_cents=Column(Integer)
 
     order=relationship("Order", back_populates="items")
     product=relationship("Product")
 
+class ArchivedOrder(Base):
+    """Delivered or cancelled orders moved out of the hot orders table"""
+    __tablename__="orders_archive"
+    id=Column(Integer, primary_key=True, autoincrement=False)
+    user_id=Column(Integer, index=True)
+    total_cents=Column(Integer)
+    status=Column(String)
+    created_at=Column(DateTime, index=True)
+    updated_at=Column(DateTime)
+    archived_at=Column(DateTime, default=datetime.utcnow)
+
+    items=relationship("ArchivedOrderItem", back_populates="order", cascade="all, delete-orphan")
+
+class ArchivedOrderItem(Base):
+    __tablename__="order_items_archive"
+    id=Column(Integer, primary_key=True, autoincrement=False)
+    order_id=Column(Integer, ForeignKey("orders_archive.id"), index=True)
+    product_id=Column(Integer)
+    quantity=Column(Integer, nullable=False)
+    price_at_time_cents=Column(Integer)
+
+    order=relationship("ArchivedOrder", back_populates="items")
+
 class CartItem(Base):
     __tablename__="cart_items"
     id=Column(Integer, primary_key=True, index=True)
     user_id=Column(Integer, ForeignKey("users.id"))
     product_id=Column(Integer, ForeignKey("products.id"))
     quantity=Column(Integer, default=1)
+    # Set while `quantity` units are counted in products.reserved
+    hold_expires_at=Column(DateTime, index=True)
 
     user=relationship("User", back_populates="cart_items")
-    product=relationship("Product")
\ No newline at end of file
+    product=relationship("Product")
+
+class CacheInvalidation(Base):
+    __tablename__="cache_invalidations"
+    id=Column(Integer, primary_key=True, index=True)
+    namespace=Column(String, nullable=False)
+    key=Column(String, nullable=False)
+    created_at=Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class IdempotencyKey(Base):
+    __tablename__="idempotency_keys"
+    __table_args__=(UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),)
+    id=Column(Integer, primary_key=True, index=True)
+    user_id=Column(Integer, ForeignKey("users.id"), nullable=False)
+    key=Column(String, nullable=False)
+    fingerprint=Column(String, nullable=False)
+    status=Column(String, default="in_progress", nullable=False)
+    response_status=Column(Integer)
+    response_body=Column(Text)
+    created_at=Column(DateTime, default=datetime.utcnow)
+    expires_at=Column(DateTime, nullable=False, index=True)
\ No newline at end of file
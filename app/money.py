@@ -0,0 +1,32 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Money is stored as integer minor units (cents) so sums stay exact in SQL.
+CENT=Decimal("0.01")
+# Largest amount whose cents still fit a signed 64-bit INTEGER column
+MAX_CENTS=2**63 - 1
+
+def parse_money(value) -> Decimal:
+    """Convert an API amount (float, str, int or Decimal) to a 2-place Decimal"""
+    if isinstance(value, bool):
+        raise ValueError("Amount must be a number")
+    if isinstance(value, float):
+        value=str(value)
+    try:
+        amount=Decimal(value)
+        if not amount.is_finite():
+            raise ValueError("Amount must be a finite number")
+        if abs(amount) * 100 > MAX_CENTS:
+            raise ValueError("Amount is too large")
+        return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError):
+        raise ValueError("Amount must be a number") from None
+
+def to_cents(value) -> int:
+    return int(parse_money(value) * 100)
+
+def from_cents(cents) -> Decimal:
+    if cents is None:
+        return None
+    if isinstance(cents, Decimal):
+        return cents
+    return (Decimal(cents) * CENT).quantize(CENT)
@@ -0,0 +1,58 @@
+"""
+Read-only row objects for list endpoints.
+
+These are built from explicit column selects, so they skip the ORM identity
+map, attribute instrumentation and lazy relationships. The response schemas
+read them with from_attributes just like ORM instances.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import app.models as models
+
+PRODUCT_FIELDS=("id", "name", "price_cents", "stock")
+ORDER_FIELDS=("id", "user_id", "total_cents", "status", "created_at", "updated_at")
+ORDER_ITEM_FIELDS=("id", "order_id", "product_id", "quantity", "price_at_time_cents")
+
+# Keeps IN lists well below SQLite's bound-parameter limit
+ITEM_LOOKUP_CHUNK=500
+
+class OrderItemRow:
+    __slots__=ORDER_ITEM_FIELDS
+
+    def __init__(self, id, order_id, product_id, quantity, price_at_time_cents):
+        self.id=id
+        self.order_id=order_id
+        self.product_id=product_id
+        self.quantity=quantity
+        self.price_at_time_cents=price_at_time_cents
+
+class OrderRow:
+    __slots__=ORDER_FIELDS + ("items",)
+
+    def __init__(self, id, user_id, total_cents, status, created_at, updated_at):
+        self.id=id
+        self.user_id=user_id
+        self.total_cents=total_cents
+        self.status=status
+        self.created_at=created_at
+        self.updated_at=updated_at
+        self.items=[]
+
+def product_columns():
+    return [getattr(models.Product, name) for name in PRODUCT_FIELDS]
+
+def order_columns(model):
+    """Columns of Order or ArchivedOrder in OrderRow argument order"""
+    return [getattr(model, name) for name in ORDER_FIELDS]
+
+def to_order_rows(db: Session, rows, item_model) -> list:
+    """Wrap selected order columns in OrderRow and attach their items"""
+    orders=[OrderRow(*row) for row in rows]
+    by_id={order.id: order for order in orders}
+    ids=list(by_id)
+    item_columns=[getattr(item_model, name) for name in ORDER_ITEM_FIELDS]
+    for start in range(0, len(ids), ITEM_LOOKUP_CHUNK):
+        chunk=ids[start:start + ITEM_LOOKUP_CHUNK]
+        for item in db.execute(select(*item_columns).where(item_model.order_id.in_(chunk)).order_by(item_model.id)):
+            by_id[item.order_id].items.append(OrderItemRow(*item))
+    return orders
@@ -0,0 +1,41 @@
+import argparse
+import sqlite3
+import time
+from sqlalchemy.engine import make_url
+from app.database import SQLALCHEMY_DATABASE_URL, REPLICA_DATABASE_URL
+
+def _sqlite_path(url: str) -> str:
+    parsed=make_url(url)
+    if not parsed.drivername.startswith("sqlite") or not parsed.database:
+        raise SystemExit(f"Replica sync only supports file-based SQLite URLs, got {url}")
+    return parsed.database
+
+def sync_replica(primary_path: str, replica_path: str, pages: int=1024):
+    """Copy the primary SQLite database into the replica file with the online backup API"""
+    source=sqlite3.connect(primary_path)
+    target=sqlite3.connect(replica_path, timeout=30)
+    try:
+        source.backup(target, pages=pages, sleep=0.01)
+    finally:
+        target.close()
+        source.close()
+
+def main():
+    """Keep a local SQLite replica in sync, e.g. `python -m app.replica_sync --interval 1`"""
+    parser=argparse.ArgumentParser(description="Copy the primary SQLite database to the read replica")
+    parser.add_argument("--primary", default=SQLALCHEMY_DATABASE_URL)
+    parser.add_argument("--replica", default=REPLICA_DATABASE_URL)
+    parser.add_argument("--interval", type=float, default=0, help="Repeat every N seconds; 0 copies once")
+    args=parser.parse_args()
+    if not args.replica:
+        raise SystemExit("Set REPLICA_DATABASE_URL or pass --replica")
+    primary_path=_sqlite_path(args.primary)
+    replica_path=_sqlite_path(args.replica)
+    while True:
+        sync_replica(primary_path, replica_path)
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
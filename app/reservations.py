@@ -0,0 +1,87 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+import app.models as models
+
+CART_HOLD_MINUTES=float(os.getenv("CART_HOLD_MINUTES", "15"))
+HOLD_SWEEP_INTERVAL_SECONDS=float(os.getenv("HOLD_SWEEP_INTERVAL_SECONDS", "30"))
+HOLD_SWEEP_BATCH_SIZE=int(os.getenv("HOLD_SWEEP_BATCH_SIZE", "500"))
+
+def hold_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(minutes=CART_HOLD_MINUTES)
+
+def reserve(db: Session, product_id: int, quantity: int) -> bool:
+    """
+    Atomically add `quantity` to a product's reserved units if that many are
+    still available. Returns False when there is not enough unreserved stock.
+    """
+    if quantity <= 0:
+        return True
+    result=db.execute(
+        update(models.Product)
+        .where(models.Product.id == product_id, models.Product.stock - models.Product.reserved >= quantity)
+        .values(reserved=models.Product.reserved + quantity),
+        execution_options={"synchronize_session": False}
+    )
+    return result.rowcount == 1
+
+def take_stock(db: Session, product_id: int, quantity: int) -> bool:
+    """
+    Atomically remove `quantity` units from stock for a direct order, never
+    dipping into units held by carts. Returns False when not enough are free.
+    """
+    result=db.execute(
+        update(models.Product)
+        .where(models.Product.id == product_id, models.Product.stock - models.Product.reserved >= quantity)
+        .values(stock=models.Product.stock - quantity),
+        execution_options={"synchronize_session": False}
+    )
+    return result.rowcount == 1
+
+def unreserve(db: Session, quantities_by_product: dict):
+    """Give held units back, one UPDATE per product"""
+    for product_id, quantity in quantities_by_product.items():
+        if quantity <= 0:
+            continue
+        db.execute(
+            update(models.Product)
+            .where(models.Product.id == product_id)
+            .values(reserved=models.Product.reserved - quantity),
+            execution_options={"synchronize_session": False}
+        )
+
+def release_expired_holds(db: Session, batch_size: int=None) -> int:
+    """
+    Sweep expired cart holds in batches. Each batch clears hold_expires_at with a
+    single UPDATE ... RETURNING. Checkout, cart updates and removal claim a hold
+    the same way, so whichever statement runs first owns it and the units are
+    never released twice. The cart items themselves are kept; checkout re-reserves
+    them if stock is still available.
+    """
+    batch_size=batch_size or HOLD_SWEEP_BATCH_SIZE
+    released=0
+    while True:
+        expired_ids=(
+            select(models.CartItem.id)
+            .where(models.CartItem.hold_expires_at < datetime.utcnow())
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        rows=db.execute(
+            update(models.CartItem)
+            .where(models.CartItem.id.in_(expired_ids), models.CartItem.hold_expires_at.is_not(None))
+            .values(hold_expires_at=None)
+            .returning(models.CartItem.product_id, models.CartItem.quantity),
+            execution_options={"synchronize_session": False}
+        ).all()
+        if not rows:
+            db.rollback()
+            return released
+        quantities=defaultdict(int)
+        for product_id, quantity in rows:
+            quantities[product_id] += quantity
+        unreserve(db, quantities)
+        db.commit()
+        released += len(rows)
@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from sqlalchemy.orm import Session
 from app import schemas
-from app.dependencies import admin_required, role_required, get_current_active_user
+import app.crud as crud
+from app.archival import archive_orders
+from app.routing import get_routing_metrics
+from app.dependencies import get_db, admin_required, role_required, get_current_active_user
 
 router=APIRouter(prefix="/admin", tags=["admin"])
 
@@ -9,8 +14,17 @@ def admin_dashboard(current_user=Depends(admin_required)):
     return {"message": "Welcome to admin dashboard"}
 
 @router.get("/reports")
-def view_reports(current_user=Depends(role_required("admin"))):
-    return {"message": "Admin reports"}
+def view_reports(db: Session=Depends(get_db), current_user=Depends(role_required("admin"))):
+    return {"message": "Admin reports", "sales": crud.get_sales_report(db)}
+
+@router.post("/archive-orders")
+def run_order_archival(older_than_days: Optional[int]=Query(None, ge=0, description="Archive delivered/cancelled orders older than this many days"), db: Session=Depends(get_db), current_user=Depends(admin_required)):
+    archived=archive_orders(db, older_than_days=older_than_days)
+    return {"archived": archived}
+
+@router.get("/db-routing")
+def db_routing_metrics(current_user=Depends(admin_required)):
+    return get_routing_metrics()
 
 @router.get("/profile")
 def user_profile(current_user=Depends(get_current_active_user)):
@@ -1,26 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Header, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from app import models, schemas
-from app.database import SessionLocal
+import app.crud as crud, app.idempotency as idempotency
+from app.money import from_cents
+from app.routing import get_user_read_db, mark_user_write
 from app.dependencies import get_db, get_current_user, admin_required
-from app.email_service import email_service
+from app.email_service import get_email_service
 
 router=APIRouter(prefix="/orders", tags=["orders"])
 
+NDJSON_MEDIA_TYPE="application/x-ndjson"
+NDJSON_CHUNK_ROWS=500
+
+def _wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def _stream_orders_ndjson(bind, **filters):
+    """Yield orders as newline-delimited JSON, a chunk of rows at a time"""
+    # Own session on the same database: the request-scoped one may be closed before streaming ends
+    db=Session(bind=bind)
+    try:
+        lines=[]
+        for order in crud.iter_orders(db, batch_size=NDJSON_CHUNK_ROWS, **filters):
+            lines.append(schemas.Order.model_validate(order).model_dump_json())
+            if len(lines) >= NDJSON_CHUNK_ROWS:
+                yield "\n".join(lines) + "\n"
+                lines=[]
+        if lines:
+            yield "\n".join(lines) + "\n"
+    finally:
+        db.close()
+
 @router.get("/", response_model=List[schemas.Order])
-def read_orders(skip: int=0, limit: int=100, db: Session=Depends(get_db), current_user: models.User=Depends(admin_required)):
-    orders=db.query(models.Order).offset(skip).limit(limit).all()
-    return orders
+def read_orders(request: Request, skip: int=0, limit: int=100, start_date: Optional[datetime]=Query(None, description="Only orders created at or after this time; older ranges include archived orders"), end_date: Optional[datetime]=Query(None, description="Only orders created at or before this time"), db: Session=Depends(get_user_read_db), current_user: models.User=Depends(admin_required)):
+    if _wants_ndjson(request):
+        return StreamingResponse(_stream_orders_ndjson(db.get_bind(), skip=skip, limit=limit, start_date=start_date, end_date=end_date), media_type=NDJSON_MEDIA_TYPE)
+    return crud.get_orders(db, skip=skip, limit=limit, start_date=start_date, end_date=end_date)
 
 @router.get("/my-orders", response_model=List[schemas.Order])
-def read_my_orders(skip: int=0,limit: int=100, db: Session=Depends(get_db), current_user: models.User=Depends(get_current_user)):
-    orders=db.query(models.Order).filter(models.Order.user_id == current_user.id).offset(skip).limit(limit).all()
-    return orders
+def read_my_orders(skip: int=0,limit: int=100, start_date: Optional[datetime]=Query(None, description="Only orders created at or after this time; older ranges include archived orders"), end_date: Optional[datetime]=Query(None, description="Only orders created at or before this time"), db: Session=Depends(get_user_read_db), current_user: models.User=Depends(get_current_user)):
+    return crud.get_orders(db, skip=skip, limit=limit, user_id=current_user.id, start_date=start_date, end_date=end_date)
 
 @router.get("/{order_id}", response_model=schemas.Order)
-def read_order(order_id: int, db: Session=Depends(get_db), current_user: models.User=Depends(get_current_user)):
-    order=db.query(models.Order).filter(models.Order.id == order_id).first()
+def read_order(order_id: int, db: Session=Depends(get_user_read_db), current_user: models.User=Depends(get_current_user)):
+    order=crud.get_order(db, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if current_user.role != "admin" and order.user_id != current_user.id:
@@ -28,75 +54,62 @@ def read_order(order_id: int, db: Session=Depends(get_db), current_user: models.
     return order
 
 @router.post("/", response_model=schemas.Order)
-def create_order(order: schemas.OrderCreate, background_tasks: BackgroundTasks, db: Session=Depends(get_db), current_user: models.User=Depends(get_current_user)):
+def create_order(order: schemas.OrderCreate, background_tasks: BackgroundTasks, idempotency_key: Optional[str]=Header(None, alias="Idempotency-Key", max_length=255), db: Session=Depends(get_db), current_user: models.User=Depends(get_current_user)):
     if current_user.role != "admin" and order.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Can only create orders for yourself") 
-    total_amount=0.0
-    order_items_data=[]
-    for item in order.items:
-        product=db.query(models.Product).filter(models.Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
-        if product.stock < item.quantity:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Not enough stock for {product.name}. Available: {product.stock}, Requested: {item.quantity}"
-            )
-        item_total=product.price * item.quantity
-        total_amount += item_total 
-        order_items_data.append({"product": product,"quantity": item.quantity, "price_at_time": product.price})
-    db_order=models.Order(user_id=order.user_id, total=total_amount, status="pending")
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-
-    for item_data in order_items_data:
-        product=item_data["product"]
-        quantity=item_data["quantity"]
-        order_item=models.OrderItem(order_id=db_order.id, product_id=product.id, quantity=quantity, price_at_time=item_data["price_at_time"])
-        db.add(order_item)
-        product.stock -= quantity
-    db.commit()
-    db.refresh(db_order)
+    if idempotency_key:
+        fingerprint=idempotency.request_fingerprint("POST", "/orders/", order.model_dump(mode="json"))
+        record, replay=idempotency.begin(db, idempotency_key, current_user.id, fingerprint)
+        if replay is not None:
+            return replay
+        try:
+            db_order=crud.create_order_with_stock_management(db, order, idempotency_record=record)
+        except Exception:
+            idempotency.release(db, idempotency_key, current_user.id)
+            raise
+    else:
+        db_order=crud.create_order_with_stock_management(db, order)
+    mark_user_write(order.user_id)
     user=db.query(models.User).filter(models.User.id == order.user_id).first()
     if user:
-        order_email_data={"id": db_order.id, "total": db_order.total, "status": db_order.status, "created_at": db_order.created_at.isoformat(), "items": [{"product_id": item.product_id, "quantity": item.quantity} for item in db_order.items]}
-        background_tasks.add_task(email_service.send_order_confirmation, user_email=user.email, username=user.username, order_data=order_email_data)
+        order_email_data={"id": db_order.id, "total": from_cents(db_order.total_cents), "status": db_order.status, "created_at": db_order.created_at.isoformat(), "items": [{"product_id": item.product_id, "quantity": item.quantity} for item in db_order.items]}
+        background_tasks.add_task(get_email_service().send_order_confirmation, user_email=user.email, username=user.username, order_data=order_email_data)
     return db_order
 
+@router.put("/status/bulk", response_model=schemas.BulkOrderStatusResult)
+def bulk_update_order_status(status_update: schemas.BulkOrderStatusUpdate, background_tasks: BackgroundTasks, db: Session=Depends(get_db), current_user: models.User=Depends(admin_required)):
+    result, transitions=crud.bulk_update_order_status(db, status_update.changes)
+    mark_user_write(current_user.id)
+    notifications=crud.get_status_notifications(db, transitions)
+    if notifications:
+        background_tasks.add_task(get_email_service().send_status_updates, notifications)
+    return result
+
 @router.put("/{order_id}/status", response_model=schemas.Order)
 def update_order_status(order_id: int, order_update: schemas.OrderUpdate, background_tasks: BackgroundTasks, db: Session=Depends(get_db), current_user: models.User=Depends(admin_required)):
-    db_order=db.query(models.Order).filter(models.Order.id == order_id).first()
-    if not db_order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    old_status=db_order.status
-    db_order.status=order_update.status
-    db.commit()
-    db.refresh(db_order)
-    if old_status != order_update.status:
-        user=db.query(models.User).filter(models.User.id == db_order.user_id).first()
-        if user:
-            order_email_data={
-                "id": db_order.id,
-                "total": db_order.total,
-                "status": db_order.status, "items": [{"product_id": item.product_id, "quantity": item.quantity} for item in db_order.items]}
-            background_tasks.add_task(email_service.send_status_update, user_email=user.email, username=user.username, order_data=order_email_data, old_status=old_status, new_status=order_update.status)
-    return db_order
+    change=schemas.OrderStatusChange(order_id=order_id, status=order_update.status)
+    result, transitions=crud.bulk_update_order_status(db, [change])
+    mark_user_write(current_user.id)
+    if result.rejected:
+        reason=result.rejected[0].reason
+        raise HTTPException(status_code=404 if reason == "Order not found" else 400, detail=reason)
+    notifications=crud.get_status_notifications(db, transitions)
+    if notifications:
+        background_tasks.add_task(get_email_service().send_status_updates, notifications)
+    return crud.get_order(db, order_id)
 
 @router.delete("/{order_id}")
 def delete_order(order_id: int, db: Session=Depends(get_db),current_user: models.User=Depends(admin_required)):
-    order=db.query(models.Order).filter(models.Order.id == order_id).first()
-    if not order:
+    restocked=crud.delete_order_with_stock_restore(db, order_id)
+    mark_user_write(current_user.id)
+    if restocked is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    for order_item in order.items:
-        product=db.query(models.Product).filter(models.Product.id == order_item.product_id).first()
-        if product:
-            product.stock += order_item.quantity
-    db.delete(order)
-    db.commit()
-    return {"detail": "Order deleted and stock restored"}
+    if restocked:
+        return {"detail": "Order deleted and stock restored"}
+    return {"detail": "Order deleted"}
 
 @router.get("/user/{user_id}", response_model=List[schemas.Order])
-def get_user_orders(user_id: int, db: Session=Depends(get_db), current_user: models.User=Depends(admin_required)):
-    orders=db.query(models.Order).filter(models.Order.user_id == user_id).all()
-    return orders
\ No newline at end of file
+def get_user_orders(request: Request, user_id: int, start_date: Optional[datetime]=Query(None, description="Only orders created at or after this time; older ranges include archived orders"), end_date: Optional[datetime]=Query(None, description="Only orders created at or before this time"), db: Session=Depends(get_user_read_db), current_user: models.User=Depends(admin_required)):
+    if _wants_ndjson(request):
+        return StreamingResponse(_stream_orders_ndjson(db.get_bind(), user_id=user_id, start_date=start_date, end_date=end_date), media_type=NDJSON_MEDIA_TYPE)
+    return crud.get_orders(db, skip=0, limit=None, user_id=user_id, start_date=start_date, end_date=end_date)
\ No newline at end of file
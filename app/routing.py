@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+from fastapi import Depends, Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app import models
+from app.database import SessionLocal, ReplicaSessionLocal, get_engine, get_replica_engine
+from app.dependencies import get_current_user
+
+REPLICA_STICKY_SECONDS=float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+STICKY_COOKIE="db_primary_until"
+SAFE_METHODS={"GET", "HEAD", "OPTIONS"}
+MAX_TRACKED_WRITERS=10000
+
+routing_metrics: Counter=Counter()
+_metrics_lock=threading.Lock()
+# user id -> wall-clock time until which that user's reads stay on the primary
+_recent_writers: Dict[int, float]={}
+
+def mark_user_write(user_id: int):
+    """Keep this user's reads on the primary for the stickiness window"""
+    now=time.time()
+    if len(_recent_writers) >= MAX_TRACKED_WRITERS:
+        for expired in [uid for uid, until in list(_recent_writers.items()) if until <= now]:
+            _recent_writers.pop(expired, None)
+    _recent_writers[user_id]=now + REPLICA_STICKY_SECONDS
+
+def _routing_decision(request: Request, user_id: Optional[int]) -> str:
+    if get_replica_engine() is None:
+        return "primary_no_replica"
+    now=time.time()
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > now:
+            return "primary_sticky_cookie"
+    except ValueError:
+        pass
+    if user_id is not None:
+        until=_recent_writers.get(user_id)
+        if until is not None:
+            if until > now:
+                return "primary_sticky_user"
+            _recent_writers.pop(user_id, None)
+    return "replica"
+
+def _read_session(request: Request, user_id: Optional[int]):
+    decision=_routing_decision(request, user_id)
+    with _metrics_lock:
+        routing_metrics[decision] += 1
+    if decision == "replica":
+        db=ReplicaSessionLocal()
+        db.info["replica"]=True
+        return db
+    get_engine()
+    return SessionLocal()
+
+def reads_from_primary(db) -> bool:
+    """False for replica sessions, whose rows may lag the primary and must not be cached"""
+    return not db.info.get("replica", False)
+
+def get_read_db(request: Request):
+    """Session for anonymous read-only endpoints such as catalog browsing"""
+    db=_read_session(request, None)
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_user_read_db(request: Request, current_user: models.User=Depends(get_current_user)):
+    """Session for a user's read-only history, kept on the primary right after their writes"""
+    db=_read_session(request, current_user.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_routing_metrics() -> dict:
+    with _metrics_lock:
+        decisions=dict(routing_metrics)
+    return {
+        "replica_configured": get_replica_engine() is not None,
+        "sticky_seconds": REPLICA_STICKY_SECONDS,
+        "decisions": decisions,
+    }
+
+class ReplicaStickinessMiddleware:
+    """
+    After a successful write request, set a short-lived cookie so the client's
+    next reads go to the primary in any worker, even before the replica syncs.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app=app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or get_replica_engine() is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until=time.time() + REPLICA_STICKY_SECONDS
+                headers=MutableHeaders(raw=message["headers"])
+                headers.append("Set-Cookie", f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(REPLICA_STICKY_SECONDS) + 1}; Path=/; HttpOnly; SameSite=Lax")
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -1,7 +1,15 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, BeforeValidator, PlainSerializer
 from typing import Optional, List
+from typing_extensions import Annotated
 from datetime import datetime
+from decimal import Decimal
 from enum import Enum
+from app.money import parse_money, from_cents
+
+# Amounts accepted from clients, rounded to whole cents
+Money=Annotated[Decimal, BeforeValidator(parse_money), Field(ge=0), PlainSerializer(float, return_type=float, when_used="json")]
+# Amounts read from integer *_cents columns
+Cents=Annotated[Decimal, BeforeValidator(from_cents), PlainSerializer(float, return_type=float, when_used="json")]
 
 class OrderStatus(str, Enum):
     PENDING="pending"
@@ -10,6 +18,15 @@ class OrderStatus(str, Enum):
     DELIVERED="delivered"
     CANCELLED="cancelled"
 
+# Allowed next states for each order status; delivered and cancelled are final
+ORDER_STATUS_TRANSITIONS={
+    OrderStatus.PENDING: {OrderStatus.CONFIRMED, OrderStatus.CANCELLED},
+    OrderStatus.CONFIRMED: {OrderStatus.SHIPPED, OrderStatus.CANCELLED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED},
+    OrderStatus.DELIVERED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+
 class AdminCreate(BaseModel):
     username: str
     email: str
@@ -36,7 +53,7 @@ class UserResponse(UserBase):
 
 class ProductBase(BaseModel):
     name: str
-    price: float
+    price: Money
     stock: int
 
 class ProductCreate(ProductBase):
@@ -44,6 +61,7 @@ class ProductCreate(ProductBase):
 
 class Product(ProductBase):
     id: int
+    price: Cents=Field(validation_alias="price_cents")
 
     class Config:
         from_attributes=True
@@ -53,11 +71,11 @@ class OrderItemBase(BaseModel):
     quantity: int
 
 class OrderItemCreate(OrderItemBase):
-    pass
+    quantity: int=Field(gt=0)
 
 class OrderItem(OrderItemBase):
     id: int
-    price_at_time: float
+    price_at_time: Cents=Field(validation_alias="price_at_time_cents")
 
     class Config:
         from_attributes=True
@@ -69,7 +87,7 @@ class OrderCreate(BaseModel):
 class Order(BaseModel):
     id: int
     user_id: int
-    total: float
+    total: Cents=Field(validation_alias="total_cents")
     status: OrderStatus
     created_at: datetime
     updated_at: datetime
@@ -81,13 +99,30 @@ class Order(BaseModel):
 class OrderUpdate(BaseModel):
     status: OrderStatus
 
+class OrderStatusChange(BaseModel):
+    order_id: int
+    status: OrderStatus
+
+class BulkOrderStatusUpdate(BaseModel):
+    changes: List[OrderStatusChange]=Field(..., max_length=10000)
+
+class OrderStatusRejection(BaseModel):
+    order_id: int
+    status: OrderStatus
+    reason: str
+
+class BulkOrderStatusResult(BaseModel):
+    updated: List[int]=[]
+    unchanged: List[int]=[]
+    rejected: List[OrderStatusRejection]=[]
+
 class CartItemBase(BaseModel):
     user_id: int
     product_id: int
     quantity: int
 
 class CartItemCreate(CartItemBase):
-    pass
+    quantity: int=Field(gt=0)
 
 class CartItem(CartItemBase):
     id: int
@@ -0,0 +1,37 @@
+import argparse
+import os
+import socket
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+def main():
+    """Run the API with several worker processes, e.g. `python -m app.serve --workers 4`"""
+    parser=argparse.ArgumentParser(description="Run the e-commerce API with multiple worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--db-pool-size", type=int, default=None, help="Connections per worker (DB_POOL_SIZE)")
+    parser.add_argument("--db-max-overflow", type=int, default=None, help="Extra connections per worker (DB_MAX_OVERFLOW)")
+    args=parser.parse_args()
+
+    # Workers are spawned as fresh processes and read their database settings
+    # from the environment, so each one builds its own engine and pool.
+    if args.db_pool_size is not None:
+        os.environ["DB_POOL_SIZE"]=str(args.db_pool_size)
+    if args.db_max_overflow is not None:
+        os.environ["DB_MAX_OVERFLOW"]=str(args.db_max_overflow)
+    if args.workers <= 1:
+        uvicorn.run("app.main:app", host=args.host, port=args.port)
+        return
+
+    config=uvicorn.Config("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    sock=config.bind_socket()
+    # Workers rebuild the inherited listening socket without its TCP protocol,
+    # so asyncio skips TCP_NODELAY on accepted connections and every response
+    # waits ~40ms on Nagle + delayed ACK. Accepted sockets inherit it from here.
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    Multiprocess(config, target=uvicorn.Server(config).run, sockets=[sock]).run()
+
+if __name__ == "__main__":
+    main()
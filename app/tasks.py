@@ -0,0 +1,32 @@
+import asyncio
+import logging
+from typing import Callable, List
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal
+
+logger=logging.getLogger(__name__)
+
+def _run_with_session(job: Callable[[Session], object]):
+    db=SessionLocal()
+    try:
+        return job(db)
+    finally:
+        db.close()
+
+async def run_periodically(job: Callable[[Session], object], interval: float):
+    """Run a maintenance job with its own session every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_run_with_session, job)
+        except Exception:
+            logger.exception("Periodic task %s failed", getattr(job, "__name__", job))
+
+def start_periodic_tasks(jobs) -> List[asyncio.Task]:
+    return [asyncio.create_task(run_periodically(job, interval)) for job, interval in jobs]
+
+async def stop_periodic_tasks(tasks: List[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,63 @@
+"""
+Hot-path order latency with a large order history, before and after archiving.
+
+Seeds --orders old delivered orders plus --hot-orders recent pending ones,
+measures the order endpoints' crud calls, moves the history into the archive
+tables with archive_orders() and measures again.
+
+    python -m benchmarks.bench_archive_hot_path --orders 10000000
+"""
+import argparse
+import random
+from datetime import datetime
+from benchmarks.common import latency_summary, prepare_database, print_table, seed, timed
+
+def measure(db, samples: int, users: int, hot_ids: list) -> list:
+    import app.crud as crud
+    rng=random.Random(0)
+    cases={
+        "GET /orders/my-orders (first page)": lambda: crud.get_orders(db, limit=20, user_id=rng.randint(1, users)),
+        "GET /orders/{id} (hot order)": lambda: crud.get_order(db, rng.choice(hot_ids)),
+        "GET /orders/ (admin, first page)": lambda: crud.get_orders(db, limit=100),
+    }
+    results=[]
+    for name, call in cases.items():
+        durations=[]
+        for _ in range(samples):
+            durations.append(timed(call)[0])
+            db.rollback()
+        results.append((name, latency_summary(durations)))
+    return results
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10_000_000, help="Historical orders to archive")
+    parser.add_argument("--hot-orders", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=10_000, help="archive_orders batch size")
+    parser.add_argument("--database", help="SQLite file to (re)create; defaults to a temp file")
+    args=parser.parse_args()
+
+    path=prepare_database(args.database)
+    seed(path, users=args.users, orders=args.orders, created_at="2020-01-01", status="delivered")
+    seed(path, users=args.users, products=0, orders=args.hot_orders, created_at=datetime.utcnow().isoformat(" "), status="pending")
+
+    from app.archival import archive_orders
+    from app.database import SessionLocal, get_engine
+    import app.models as models
+
+    get_engine()
+    db=SessionLocal()
+    try:
+        hot_ids=[order_id for (order_id,) in db.query(models.Order.id).filter(models.Order.status == "pending")]
+        before=measure(db, args.samples, args.users, hot_ids)
+        archive_seconds, archived=timed(archive_orders, db, batch_size=args.batch_size)
+        after=measure(db, args.samples, args.users, hot_ids)
+    finally:
+        db.close()
+    print(f"{args.orders:,} historical + {args.hot_orders:,} hot orders; archived {archived:,} in {archive_seconds:.1f}s")
+    print_table(("query", "history in hot table", "history archived"), [(name, b, a) for (name, b), (_, a) in zip(before, after)])
+
+if __name__ == "__main__":
+    main()
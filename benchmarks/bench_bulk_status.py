@@ -0,0 +1,56 @@
+"""
+Bulk order status transitions at 10k orders per call.
+
+Times crud.bulk_update_order_status for one call confirming --orders pending
+orders and one call cancelling them (which restocks in bulk), plus building
+the batched notification list. For comparison, the same confirmations are
+applied one order per call, as repeated PUT /orders/{id}/status requests would.
+
+    python -m benchmarks.bench_bulk_status --orders 10000
+"""
+import argparse
+from benchmarks.common import prepare_database, print_table, seed, timed
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10_000, help="Orders per bulk call (the API caps this at 10k)")
+    parser.add_argument("--database", help="SQLite file to (re)create; defaults to a temp file")
+    args=parser.parse_args()
+
+    path=prepare_database(args.database)
+    seed(path, users=100, orders=args.orders * 2, items_per_order=2, status="pending")
+
+    from app.database import SessionLocal, get_engine
+    import app.crud as crud, app.models as models, app.schemas as schemas
+
+    get_engine()
+    db=SessionLocal()
+    try:
+        ids=[order_id for (order_id,) in db.query(models.Order.id).order_by(models.Order.id)]
+        bulk_ids, single_ids=ids[:args.orders], ids[args.orders:]
+
+        def changes(order_ids, status):
+            return [schemas.OrderStatusChange(order_id=order_id, status=status) for order_id in order_ids]
+
+        confirm_seconds, (confirmed, transitions)=timed(crud.bulk_update_order_status, db, changes(bulk_ids, "confirmed"))
+        notify_seconds, notifications=timed(crud.get_status_notifications, db, transitions)
+        cancel_seconds, (cancelled, _)=timed(crud.bulk_update_order_status, db, changes(bulk_ids, "cancelled"))
+
+        def one_per_call():
+            for order_id in single_ids:
+                crud.bulk_update_order_status(db, changes([order_id], "confirmed"))
+        single_seconds, _=timed(one_per_call)
+    finally:
+        db.close()
+
+    def rate(count, seconds):
+        return f"{count / seconds:,.0f}"
+    print_table(("operation", "orders", "seconds", "orders/s"), [
+        ("bulk confirm (1 call)", len(confirmed.updated), f"{confirm_seconds:.3f}", rate(len(confirmed.updated), confirm_seconds)),
+        ("build notification batch", len(notifications), f"{notify_seconds:.3f}", rate(len(notifications), notify_seconds)),
+        ("bulk cancel + restock (1 call)", len(cancelled.updated), f"{cancel_seconds:.3f}", rate(len(cancelled.updated), cancel_seconds)),
+        ("confirm one order per call", len(single_ids), f"{single_seconds:.3f}", rate(len(single_ids), single_seconds)),
+    ])
+
+if __name__ == "__main__":
+    main()
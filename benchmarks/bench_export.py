@@ -0,0 +1,87 @@
+"""
+Bytes on the wire and peak RSS for a large admin order export.
+
+Seeds --orders orders, then fetches GET /orders/ with every order in one
+response, once per format/encoding. Each fetch runs in its own process so
+the peak RSS it reports belongs to that export alone; the app and client
+share the process, as with the test client.
+
+    python -m benchmarks.bench_export --orders 100000
+"""
+import argparse
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from benchmarks.common import ROOT, prepare_database, print_table, seed
+
+MODES={
+    "JSON array": ("application/json", "identity"),
+    "JSON array, gzip": ("application/json", "gzip"),
+    "NDJSON stream": ("application/x-ndjson", "identity"),
+    "NDJSON stream, gzip": ("application/x-ndjson", "gzip"),
+    "NDJSON stream, br": ("application/x-ndjson", "br"),
+    "NDJSON stream, zstd": ("application/x-ndjson", "zstd"),
+}
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def export(mode: str, orders: int):
+    """Child process: run one export and print 'wire_bytes seconds baseline_rss peak_rss'"""
+    from fastapi.testclient import TestClient
+    from app.compression import COMPRESSORS
+    from app.dependencies import create_access_token
+    from app.main import app
+
+    accept, encoding=MODES[mode]
+    if encoding != "identity" and encoding not in COMPRESSORS:
+        print("unavailable")
+        return
+    headers={"Authorization": f"Bearer {create_access_token({'sub': 'user1'})}", "Accept": accept, "Accept-Encoding": encoding}
+    with TestClient(app) as client:
+        baseline=_peak_rss_mb()
+        start=time.perf_counter()
+        wire_bytes=0
+        with client.stream("GET", f"/orders/?limit={orders}", headers=headers) as response:
+            response.raise_for_status()
+            for chunk in response.iter_raw():
+                wire_bytes += len(chunk)
+        print(wire_bytes, time.perf_counter() - start, baseline, _peak_rss_mb())
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--database", help="SQLite file to (re)create; defaults to a temp file")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args=parser.parse_args()
+    if args.child:
+        export(args.child, args.orders)
+        return
+
+    path=prepare_database(args.database)
+    seed(path, users=1, orders=args.orders, items_per_order=3, status="pending")
+    with sqlite3.connect(path) as con:
+        con.execute("UPDATE users SET role = 'admin' WHERE username = 'user1'")
+
+    rows=[]
+    env=dict(os.environ, PYTHONPATH=str(ROOT))
+    for mode in MODES:
+        output=subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_export", "--child", mode, "--orders", str(args.orders)],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        if output == "unavailable":
+            rows.append((mode, "-", "-", "-", "module not installed"))
+            continue
+        wire_bytes, seconds, baseline, peak=(float(value) for value in output.split())
+        rows.append((mode, f"{wire_bytes / 1024 / 1024:.2f}", f"{seconds:.2f}", f"{peak:.0f}", f"{peak - baseline:+.0f}"))
+    print(f"{args.orders:,} orders")
+    print_table(("format", "wire MB", "seconds", "peak RSS MB", "RSS growth MB"), rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Reporting aggregates over integer cents versus the old float amounts.
+
+Seeds orders, copies their totals into a scratch table with a REAL column
+(how amounts were stored before the cents migration) and compares the
+revenue sums against the exact value: the integer sum must match exactly
+while the float sum drifts, and both are timed.
+
+    python -m benchmarks.bench_money_sums --orders 1000000
+"""
+import argparse
+from decimal import Decimal
+from benchmarks.common import prepare_database, print_table, seed, timed
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", help="SQLite file to (re)create; defaults to a temp file")
+    args=parser.parse_args()
+
+    path=prepare_database(args.database)
+    seed(path, users=100, products=997, orders=args.orders, items_per_order=3, status="delivered")
+
+    from sqlalchemy import text
+    from app.database import SessionLocal, get_engine
+    import app.crud as crud
+
+    get_engine()
+    db=SessionLocal()
+    try:
+        db.execute(text("CREATE TABLE orders_float AS SELECT id, status, total_cents / 100.0 AS total FROM orders"))
+        db.commit()
+        exact=sum(Decimal(cents) for (cents,) in db.execute(text("SELECT total_cents FROM orders"))) / 100
+
+        def best(fn):
+            return min(timed(fn)[0] for _ in range(args.repeat))
+
+        def integer_sql():
+            return db.execute(text("SELECT status, COUNT(id), SUM(total_cents) FROM orders GROUP BY status")).all()
+
+        def float_sql():
+            return db.execute(text("SELECT status, COUNT(id), SUM(total) FROM orders_float GROUP BY status")).all()
+
+        def float_python():
+            return sum(total for (total,) in db.execute(text("SELECT total FROM orders_float")))
+
+        report=crud.get_sales_report(db)
+        float_sql_total=sum(row[2] for row in float_sql())
+        float_python_total=float_python()
+        integer_sql_total=Decimal(sum(row[2] for row in integer_sql())) / 100
+        rows=[
+            ("integer cents, SQL SUM", f"{best(integer_sql) * 1000:.1f}", integer_sql_total, f"{integer_sql_total - exact:.2e}"),
+            ("integer cents, get_sales_report", f"{best(lambda: crud.get_sales_report(db)) * 1000:.1f}", report["revenue"], f"{report['revenue'] - exact:.2e}"),
+            ("float, SQL SUM", f"{best(float_sql) * 1000:.1f}", f"{float_sql_total:.6f}", f"{Decimal(float_sql_total) - exact:.2e}"),
+            ("float, summed in Python", f"{best(float_python) * 1000:.1f}", f"{float_python_total:.6f}", f"{Decimal(float_python_total) - exact:.2e}"),
+        ]
+    finally:
+        db.close()
+    print(f"{args.orders:,} orders, exact revenue {exact}")
+    print_table(("method", "best ms", "revenue", "error"), rows)
+
+if __name__ == "__main__":
+    main()
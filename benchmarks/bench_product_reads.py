@@ -0,0 +1,92 @@
+"""
+Product read throughput as worker processes scale from 1 to N.
+
+Starts `python -m app.serve --workers n` for each n and drives GET
+/products/{id} from client processes over keep-alive connections. Every
+worker keeps its own product cache, so throughput should grow with workers
+until the cores or the load generator run out.
+
+    python -m benchmarks.bench_product_reads --workers 1 2 4 --duration 10
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from benchmarks.common import ROOT, prepare_database, print_table, seed
+
+def _wait_for_server(port: int, timeout: float=30):
+    """The port opens before workers finish importing the app, so wait for a real response"""
+    deadline=time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection=http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def _client(port: int, products: int, duration: float, results):
+    connection=http.client.HTTPConnection("127.0.0.1", port)
+    rng=random.Random(os.getpid())
+    done=0
+    deadline=time.monotonic() + duration
+    while time.monotonic() < deadline:
+        connection.request("GET", f"/products/{rng.randint(1, products)}")
+        response=connection.getresponse()
+        response.read()
+        if response.status == 200:
+            done += 1
+    connection.close()
+    results.put(done)
+
+def run(workers: int, port: int, clients: int, products: int, duration: float) -> float:
+    server=subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port)],
+        cwd=ROOT, env=dict(os.environ, PYTHONPATH=str(ROOT)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_for_server(port)
+        # Let the remaining workers come up, then warm their caches
+        time.sleep(workers)
+        _client(port, products, 2.0, multiprocessing.Queue())
+        results=multiprocessing.Queue()
+        processes=[multiprocessing.Process(target=_client, args=(port, products, duration, results)) for _ in range(clients)]
+        for process in processes:
+            process.start()
+        total=sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        return total / duration
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--clients", type=int, default=(os.cpu_count() or 1) * 2, help="Concurrent client processes")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per measurement")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database", help="SQLite file to (re)create; defaults to a temp file")
+    args=parser.parse_args()
+
+    path=prepare_database(args.database)
+    seed(path, products=args.products)
+    rows=[]
+    baseline=None
+    for workers in sorted(set(args.workers)):
+        throughput=run(workers, args.port, args.clients, args.products, args.duration)
+        baseline=baseline or throughput
+        rows.append((workers, f"{throughput:,.0f}", f"{throughput / baseline:.2f}x"))
+    print_table(("workers", "req/s", "scaling"), rows)
+
+if __name__ == "__main__":
+    main()
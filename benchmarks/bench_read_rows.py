@@ -0,0 +1,68 @@
+"""
+Slotted read rows versus ORM entities for 10k-row result sets.
+
+Loads --rows products and --rows orders (with their items) both as ORM
+entities and as the read-only rows the list endpoints use, and reports
+rows/sec plus memory retained per row (measured with tracemalloc). Each
+run uses a fresh session so the identity map starts empty.
+
+    python -m benchmarks.bench_read_rows --rows 10000
+"""
+import argparse
+import gc
+import tracemalloc
+from benchmarks.common import prepare_database, print_table, seed, timed
+
+def retained_bytes(load) -> int:
+    """Memory still allocated while the loaded result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    before=tracemalloc.get_traced_memory()[0]
+    result=load()
+    after=tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+def main():
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", help="SQLite file to (re)create; defaults to a temp file")
+    args=parser.parse_args()
+
+    path=prepare_database(args.database)
+    seed(path, users=100, products=args.rows, orders=args.rows, items_per_order=3, status="pending")
+
+    from sqlalchemy.orm import selectinload
+    from app.database import SessionLocal, get_engine
+    from app.readmodels import order_columns, product_columns, to_order_rows
+    import app.models as models
+
+    get_engine()
+
+    def in_session(query):
+        def load():
+            db=SessionLocal()
+            try:
+                return query(db)
+            finally:
+                db.close()
+        return load
+
+    cases=[
+        ("products, ORM entities", in_session(lambda db: db.query(models.Product).limit(args.rows).all())),
+        ("products, column rows", in_session(lambda db: db.query(*product_columns()).limit(args.rows).all())),
+        ("orders + items, ORM entities", in_session(lambda db: db.query(models.Order).options(selectinload(models.Order.items)).order_by(models.Order.id).limit(args.rows).all())),
+        ("orders + items, slotted rows", in_session(lambda db: to_order_rows(db, db.query(*order_columns(models.Order)).order_by(models.Order.id).limit(args.rows).all(), models.OrderItem))),
+    ]
+    rows=[]
+    for name, load in cases:
+        seconds=min(timed(load)[0] for _ in range(args.repeat))
+        per_row=retained_bytes(load) / args.rows
+        rows.append((name, f"{args.rows / seconds:,.0f}", f"{per_row:,.0f}"))
+    print(f"{args.rows:,} rows per result set; orders carry 3 items each")
+    print_table(("result", "rows/s", "bytes/row"), rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Shared setup for the standalone benchmarks in this directory.
+
+Benchmarks run against a throwaway SQLite database migrated to head, e.g.
+`python -m benchmarks.bench_read_rows`. DATABASE_URL is set before any app
+module is imported, so import app code inside the benchmark's main().
+"""
+import os
+import statistics
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+ROOT=Path(__file__).resolve().parents[1]
+
+def prepare_database(path: str=None) -> str:
+    """Point the app at a fresh SQLite file and migrate it to head; returns the file path"""
+    if path is None:
+        path=os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    elif os.path.exists(path):
+        os.remove(path)
+    os.environ["DATABASE_URL"]=f"sqlite:///{path}"
+    os.environ.pop("REPLICA_DATABASE_URL", None)
+    from alembic import command
+    from alembic.config import Config
+    config=Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    command.upgrade(config, "head")
+    return path
+
+def seed(path: str, users: int=1, products: int=100, orders: int=0, items_per_order: int=1, created_at: str="2020-01-01", status: str="delivered"):
+    """
+    Bulk-load users, products and orders with recursive CTEs, far faster than
+    going through the API. Order totals match their items.
+    """
+    con=sqlite3.connect(path)
+    try:
+        con.execute(
+            "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?) "
+            "INSERT INTO users (username, email, hashed_password, role) "
+            "SELECT 'user' || n, 'user' || n || '@example.com', 'x', 'customer' FROM seq "
+            "WHERE NOT EXISTS (SELECT 1 FROM users WHERE username = 'user' || n)",
+            (users,)
+        )
+        if products:
+            con.execute(
+                "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?) "
+                "INSERT INTO products (name, price_cents, stock, reserved) "
+                "SELECT 'product ' || n, 99 + (n * 7919) % 100000, 1000000, 0 FROM seq",
+                (products,)
+            )
+        # Order items reference every product seeded so far, including earlier calls
+        products=con.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        if orders:
+            first_order=con.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0] + 1
+            con.execute(
+                "WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < ? - 1) "
+                "INSERT INTO orders (id, user_id, total_cents, status, created_at, updated_at) "
+                "SELECT ? + n, 1 + n % ?, 0, ?, datetime(?, '+' || (n % 86400) || ' seconds'), datetime(?, '+' || (n % 86400) || ' seconds') FROM seq",
+                (orders, first_order, users, status, created_at, created_at)
+            )
+            con.execute(
+                "WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < ? - 1) "
+                "INSERT INTO order_items (order_id, product_id, quantity, price_at_time_cents) "
+                "SELECT ? + n / ?, 1 + n % ?, 1 + n % 3, 99 + ((1 + n % ?) * 7919) % 100000 FROM seq",
+                (orders * items_per_order, first_order, items_per_order, products, products)
+            )
+            con.execute(
+                "UPDATE orders SET total_cents = (SELECT SUM(quantity * price_at_time_cents) FROM order_items WHERE order_id = orders.id) "
+                "WHERE id >= ?",
+                (first_order,)
+            )
+        con.commit()
+    finally:
+        con.close()
+
+def timed(fn, *args, **kwargs):
+    """Run fn once; returns (seconds, result)"""
+    start=time.perf_counter()
+    result=fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def latency_summary(samples) -> str:
+    """p50/p99/max of a list of durations in seconds, formatted in milliseconds"""
+    ordered=sorted(samples)
+    p99=ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered) * 1000:.2f}ms  p99 {p99 * 1000:.2f}ms  max {ordered[-1] * 1000:.2f}ms"
+
+def print_table(headers, rows):
+    widths=[max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in [headers] + list(rows):
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
@@ -0,0 +1,32 @@
+from logging.config import fileConfig
+from alembic import context
+from app.database import SQLALCHEMY_DATABASE_URL, get_engine
+from app.models import Base
+
+config=context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata=Base.metadata
+
+def run_migrations_offline():
+    context.configure(
+        url=SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    with get_engine().connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,27 @@
+"""cache invalidation log
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision="0002"
+down_revision="0001"
+branch_labels=None
+depends_on=None
+
+def upgrade():
+    op.create_table(
+        "cache_invalidations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("namespace", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_cache_invalidations_id", "cache_invalidations", ["id"])
+    op.create_index("ix_cache_invalidations_created_at", "cache_invalidations", ["created_at"])
+
+def downgrade():
+    op.drop_table("cache_invalidations")
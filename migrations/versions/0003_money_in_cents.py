@@ -0,0 +1,36 @@
+"""store money as integer cents
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision="0003"
+down_revision="0002"
+branch_labels=None
+depends_on=None
+
+# (table, float column, integer cents column)
+MONEY_COLUMNS=[
+    ("products", "price", "price_cents"),
+    ("orders", "total", "total_cents"),
+    ("order_items", "price_at_time", "price_at_time_cents"),
+]
+
+def upgrade():
+    for table, float_column, cents_column in MONEY_COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column(cents_column, sa.Integer()))
+        op.execute(f"UPDATE {table} SET {cents_column} = CAST(ROUND({float_column} * 100) AS INTEGER) WHERE {float_column} IS NOT NULL")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(float_column)
+
+def downgrade():
+    for table, float_column, cents_column in MONEY_COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column(float_column, sa.Float()))
+        op.execute(f"UPDATE {table} SET {float_column} = {cents_column} / 100.0 WHERE {cents_column} IS NOT NULL")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(cents_column)
@@ -0,0 +1,48 @@
+"""order archive tables and order date indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision="0004"
+down_revision="0003"
+branch_labels=None
+depends_on=None
+
+def upgrade():
+    op.create_index("ix_orders_user_id", "orders", ["user_id"])
+    op.create_index("ix_orders_created_at", "orders", ["created_at"])
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id"])
+
+    op.create_table(
+        "orders_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("user_id", sa.Integer()),
+        sa.Column("total_cents", sa.Integer()),
+        sa.Column("status", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("archived_at", sa.DateTime()),
+    )
+    op.create_index("ix_orders_archive_user_id", "orders_archive", ["user_id"])
+    op.create_index("ix_orders_archive_created_at", "orders_archive", ["created_at"])
+
+    op.create_table(
+        "order_items_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders_archive.id")),
+        sa.Column("product_id", sa.Integer()),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("price_at_time_cents", sa.Integer()),
+    )
+    op.create_index("ix_order_items_archive_order_id", "order_items_archive", ["order_id"])
+
+def downgrade():
+    op.drop_table("order_items_archive")
+    op.drop_table("orders_archive")
+    op.drop_index("ix_order_items_order_id", table_name="order_items")
+    op.drop_index("ix_orders_created_at", table_name="orders")
+    op.drop_index("ix_orders_user_id", table_name="orders")
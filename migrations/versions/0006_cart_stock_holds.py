@@ -0,0 +1,27 @@
+"""stock reservation holds for cart items
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision="0006"
+down_revision="0005"
+branch_labels=None
+depends_on=None
+
+def upgrade():
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.add_column(sa.Column("reserved", sa.Integer(), nullable=False, server_default="0"))
+    with op.batch_alter_table("cart_items") as batch_op:
+        batch_op.add_column(sa.Column("hold_expires_at", sa.DateTime()))
+    op.create_index("ix_cart_items_hold_expires_at", "cart_items", ["hold_expires_at"])
+
+def downgrade():
+    op.drop_index("ix_cart_items_hold_expires_at", table_name="cart_items")
+    with op.batch_alter_table("cart_items") as batch_op:
+        batch_op.drop_column("hold_expires_at")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("reserved")
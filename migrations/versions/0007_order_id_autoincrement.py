@@ -0,0 +1,35 @@
+"""never reuse order ids that were moved to the archive
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision="0007"
+down_revision="0006"
+branch_labels=None
+depends_on=None
+
+# hot table -> archive table whose ids it must never hand out again
+ARCHIVED_TABLES={"orders": "orders_archive", "order_items": "order_items_archive"}
+
+def upgrade():
+    # AUTOINCREMENT stops SQLite from reusing the ids of archived orders
+    for table in ARCHIVED_TABLES:
+        with op.batch_alter_table(table, recreate="always", table_kwargs={"sqlite_autoincrement": True}):
+            pass
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    # Start each sequence past ids already archived, not just past the hot table
+    for table, archive in ARCHIVED_TABLES.items():
+        op.execute(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+        op.execute(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', "
+            f"MAX(COALESCE((SELECT MAX(id) FROM {table}), 0), COALESCE((SELECT MAX(id) FROM {archive}), 0))"
+        )
+
+def downgrade():
+    for table in ARCHIVED_TABLES:
+        with op.batch_alter_table(table, recreate="always", table_kwargs={"sqlite_autoincrement": False}):
+            pass
@@ -0,0 +1,49 @@
+"""
+Import-time and cold-start budgets.
+
+Each check runs in a fresh interpreter so module caches from other tests do
+not hide import cost. Budgets can be tightened or relaxed per machine with
+IMPORT_BUDGET_SECONDS and COLD_START_BUDGET_SECONDS.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT=Path(__file__).resolve().parents[1]
+IMPORT_BUDGET_SECONDS=float(os.getenv("IMPORT_BUDGET_SECONDS", "3"))
+COLD_START_BUDGET_SECONDS=float(os.getenv("COLD_START_BUDGET_SECONDS", "5"))
+
+def _run(code: str, database_path: Path) -> str:
+    env=dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", PYTHONPATH=str(ROOT))
+    env.pop("REPLICA_DATABASE_URL", None)
+    result=subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+
+def test_import_opens_no_database_and_fits_budget(tmp_path):
+    database_path=tmp_path / "import.db"
+    elapsed=float(_run(
+        "import time\n"
+        "start=time.perf_counter()\n"
+        "import app.main\n"
+        "print(time.perf_counter() - start)",
+        database_path
+    ))
+    assert not database_path.exists(), "importing app.main must not create or touch the database"
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"import app.main took {elapsed:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+
+def test_cold_start_fits_budget(tmp_path):
+    database_path=tmp_path / "cold.db"
+    _run("from alembic import command\nfrom alembic.config import Config\ncommand.upgrade(Config('alembic.ini'), 'head')", database_path)
+    elapsed=float(_run(
+        "import time\n"
+        "start=time.perf_counter()\n"
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "with TestClient(app) as client:\n"
+        "    assert client.get('/').status_code == 200\n"
+        "print(time.perf_counter() - start)",
+        database_path
+    ))
+    assert elapsed < COLD_START_BUDGET_SECONDS, f"cold start took {elapsed:.2f}s (budget {COLD_START_BUDGET_SECONDS}s)"